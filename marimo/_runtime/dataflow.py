@@ -12,7 +12,7 @@ from marimo._ast.cell import (
 )
 from marimo._ast.compiler import code_key
 from marimo._ast.variables import is_mangled_local
-from marimo._ast.visitor import ImportData, Name, VariableData
+from marimo._ast.visitor import ImportData, Language, Name, VariableData
 from marimo._runtime.executor import execute_cell, execute_cell_async
 from marimo._types.ids import CellId_t
 
@@ -31,6 +31,116 @@ EdgeWithVar = tuple[CellId_t, list[str], CellId_t]
 LOGGER = _loggers.marimo_logger()
 
 
+class _TopologicalOrder:
+    """A topological order of a graph's cells, maintained incrementally.
+
+    Uses the dynamic topological sort of Pearce and Kelly: adding an edge
+    (u, v) with u already before v is free, and otherwise only the cells
+    positioned between v and u are searched and reordered. This lets cycle
+    detection skip or bound its search instead of traversing the whole graph.
+
+    A topological order doesn't exist while the graph has a cycle; the order
+    is marked invalid until the cycle is broken and it is recomputed.
+    """
+
+    def __init__(self) -> None:
+        # Unique, but not necessarily contiguous, position for every cell
+        self.positions: dict[CellId_t, int] = {}
+        self.valid = True
+        self._next_position = 0
+
+    def add_cell(self, cell_id: CellId_t) -> None:
+        self.positions[cell_id] = self._next_position
+        self._next_position += 1
+
+    def remove_cell(self, cell_id: CellId_t) -> None:
+        # Removing a cell (and its edges) never invalidates an order.
+        del self.positions[cell_id]
+
+    def add_edge(
+        self,
+        parent_id: CellId_t,
+        child_id: CellId_t,
+        children: dict[CellId_t, set[CellId_t]],
+        parents: dict[CellId_t, set[CellId_t]],
+    ) -> None:
+        """Restore the order after adding an edge that doesn't form a cycle."""
+        if not self.valid:
+            return
+        lower = self.positions[child_id]
+        upper = self.positions[parent_id]
+        if upper < lower:
+            return
+
+        # Cells in the affected region: descendants of the child and
+        # ancestors of the parent that are positioned between the two.
+        forward = self._search(
+            child_id, children, lambda cid: self.positions[cid] < upper
+        )
+        backward = self._search(
+            parent_id, parents, lambda cid: self.positions[cid] > lower
+        )
+
+        # Move the parent's ancestors ahead of the child's descendants,
+        # reusing the positions of the affected cells.
+        def by_position(cells: set[CellId_t]) -> list[CellId_t]:
+            return sorted(cells, key=self.positions.__getitem__)
+
+        reordered = by_position(backward) + by_position(forward)
+        slots = sorted(self.positions[cid] for cid in reordered)
+        for cid, position in zip(reordered, slots):
+            self.positions[cid] = position
+
+    def recompute(
+        self,
+        parents: dict[CellId_t, set[CellId_t]],
+        children: dict[CellId_t, set[CellId_t]],
+    ) -> None:
+        """Recompute the order from scratch, e.g. after a cycle is broken.
+
+        The order stays invalid if the graph still has a cycle.
+        """
+        in_degree = {cid: len(parents[cid]) for cid in self.positions}
+        queue = deque(
+            sorted(
+                (cid for cid, degree in in_degree.items() if degree == 0),
+                key=self.positions.__getitem__,
+            )
+        )
+        ordered: list[CellId_t] = []
+        while queue:
+            cid = queue.popleft()
+            ordered.append(cid)
+            for child in children[cid]:
+                in_degree[child] -= 1
+                if in_degree[child] == 0:
+                    queue.append(child)
+
+        if len(ordered) != len(self.positions):
+            self.valid = False
+            return
+
+        self.positions = {cid: index for index, cid in enumerate(ordered)}
+        self._next_position = len(ordered)
+        self.valid = True
+
+    @staticmethod
+    def _search(
+        source: CellId_t,
+        relatives: dict[CellId_t, set[CellId_t]],
+        predicate: Callable[[CellId_t], bool],
+    ) -> set[CellId_t]:
+        found = {source}
+        stack = [source]
+        while stack:
+            cid = stack.pop()
+            for relative in relatives[cid]:
+                if relative not in found and predicate(relative):
+                    found.add(relative)
+                    stack.append(relative)
+        return found
+
+
 # TODO(akshayka): Add method disable_cell, enable_cell which handle
 # state transitions on cells
 @dataclass(frozen=True)
@@ -57,9 +167,27 @@ class DirectedGraph:
     # A mapping from defs to the cells that define them
     definitions: dict[Name, set[CellId_t]] = field(default_factory=dict)
 
+    # An inverted index from refs to the cells that refer to them, split by
+    # the language of the referring cell; kept in sync by register_cell and
+    # delete_cell so that looking up referring cells doesn't scan the graph.
+    references: dict[Language, dict[Name, set[CellId_t]]] = field(
+        default_factory=lambda: {"python": {}, "sql": {}}
+    )
+
     # The set of cycles in the graph
     cycles: set[tuple[Edge, ...]] = field(default_factory=set)
 
+    # A mapping from edges to the cycles that contain them
+    _cycles_by_edge: dict[Edge, set[tuple[Edge, ...]]] = field(
+        default_factory=dict
+    )
+
+    # A topological order of the cells, maintained as edges are added to
+    # bound the search for cycles
+    _topological_order: _TopologicalOrder = field(
+        default_factory=_TopologicalOrder
+    )
+
     # This lock must be acquired during methods that mutate the graph; it's
     # only needed because a graph is shared between the kernel and the code
     # completion service. It should almost always be uncontended.
@@ -91,24 +219,42 @@ class DirectedGraph:
         Only does a local analysis of refs, without taking into consideration
         whether refs are defined by other cells.
         """
+        sql_cells = self.references["sql"].get(name, set())
         if language == "sql":
             # For SQL, only return SQL cells that reference the name
-            return {
-                cid
-                for cid, cell in self.cells.items()
-                if name in cell.refs and cell.language == "sql"
-            }
+            return set(sql_cells)
         else:
             # For Python, return all cells that reference the name
-            return {
-                cid for cid, cell in self.cells.items() if name in cell.refs
-            }
+            return self.references["python"].get(name, set()) | sql_cells
+
+    def _index_references(self, cell_id: CellId_t, cell: CellImpl) -> None:
+        index = self.references[cell.language]
+        for name in cell.refs:
+            index.setdefault(name, set()).add(cell_id)
+
+    def _unindex_references(self, cell_id: CellId_t, cell: CellImpl) -> None:
+        index = self.references[cell.language]
+        for name in cell.refs:
+            referring_cells = index.get(name)
+            if referring_cells is None:
+                continue
+            referring_cells.discard(cell_id)
+            if not referring_cells:
+                del index[name]
 
     def get_path(self, source: CellId_t, dst: CellId_t) -> list[Edge]:
         """Get a path from `source` to `dst`, if any."""
         if source == dst:
             return []
 
+        # When the graph is acyclic, every cell on a path to `dst` is
+        # positioned before `dst` in the topological order, so the search
+        # can be restricted to those cells.
+        order = self._topological_order
+        bound = order.positions[dst] if order.valid else None
+        if bound is not None and order.positions[source] > bound:
+            return []
+
         # deque has O(1) append/pop operation
         queue: deque[tuple[CellId_t, list[Edge]]] = deque([(source, [])])
         found = {source}  # set has O(1) lookups
@@ -116,7 +262,9 @@ class DirectedGraph:
         while queue:
             node, path = queue.popleft()  # O(1) operation
             for cid in self.children[node]:
-                if cid not in found:
+                if cid not in found and (
+                    bound is None or order.positions[cid] <= bound
+                ):
                     next_path = path + [(node, cid)]
                     if cid == dst:
                         return next_path
@@ -136,19 +284,19 @@ class DirectedGraph:
             LOGGER.debug("Acquired graph lock.")
             assert cell_id not in self.cells
             self.cells[cell_id] = cell
+            self._index_references(cell_id, cell)
+            self._topological_order.add_cell(cell_id)
             # Children are the set of cells that refer to a name defined in
             # `cell`
-            children: set[CellId_t] = set()
-            # Cells that define the same name as this one
-            siblings: set[CellId_t] = set()
+            self.children[cell_id] = set()
             # Parents are the set of cells that define a name referred to by
             # `cell`
-            parents: set[CellId_t] = set()
+            self.parents[cell_id] = set()
+            # Cells that define the same name as this one
+            siblings: set[CellId_t] = set()
+            self.siblings[cell_id] = siblings
 
             # Populate children, siblings, and parents
-            self.children[cell_id] = children
-            self.siblings[cell_id] = siblings
-            self.parents[cell_id] = parents
             for name, variable_data in cell.variable_data.items():
                 self.definitions.setdefault(name, set()).add(cell_id)
                 for sibling in self.definitions[name]:
@@ -163,17 +311,8 @@ class DirectedGraph:
                     name,
                     language=variable_data[-1].language,
                 ) - set((cell_id,))
-                # we will add an edge (cell_id, v) for each v in
-                # referring_cells; if there is a path from v to cell_id, then
-                # the new edge will form a cycle
                 for v in referring_cells:
-                    path = self.get_path(v, cell_id)
-                    if path:
-                        self.cycles.add(tuple([(cell_id, v)] + path))
-
-                children.update(referring_cells)
-                for child in referring_cells:
-                    self.parents[child].add(cell_id)
+                    self._add_edge(cell_id, v)
 
             for name in cell.refs:
                 other_ids_defining_name = (
@@ -191,14 +330,7 @@ class DirectedGraph:
                     if language == "sql" and cell.language == "python":
                         # SQL table/db def -> Python ref is not an edge
                         continue
-                    parents.add(other_id)
-                    # we are adding an edge (other_id, cell_id). If there
-                    # is a path from cell_id to other_id, then the new
-                    # edge forms a cycle
-                    path = self.get_path(cell_id, other_id)
-                    if path:
-                        self.cycles.add(tuple([(other_id, cell_id)] + path))
-                    self.children[other_id].add(cell_id)
+                    self._add_edge(other_id, cell_id)
         LOGGER.debug("Registered cell %s and released graph lock", cell_id)
         if self.is_any_ancestor_stale(cell_id):
             self.set_stale(set([cell_id]))
@@ -206,6 +338,30 @@ class DirectedGraph:
         if self.is_any_ancestor_disabled(cell_id):
             cell.set_runtime_state(status="disabled-transitively")
 
+    def _add_edge(self, parent_id: CellId_t, child_id: CellId_t) -> None:
+        """Add the edge (parent_id, child_id), recording any cycle it closes.
+
+        Requires `self.lock` to be held.
+        """
+        if child_id in self.children[parent_id]:
+            return
+
+        # If there is a path from the child to the parent, then the new edge
+        # forms a cycle
+        path = self.get_path(child_id, parent_id)
+        self.children[parent_id].add(child_id)
+        self.parents[child_id].add(parent_id)
+        if path:
+            cycle = tuple([(parent_id, child_id)] + path)
+            self.cycles.add(cycle)
+            for edge in cycle:
+                self._cycles_by_edge.setdefault(edge, set()).add(cycle)
+            self._topological_order.valid = False
+        else:
+            self._topological_order.add_edge(
+                parent_id, child_id, self.children, self.parents
+            )
+
     def is_any_ancestor_stale(self, cell_id: CellId_t) -> bool:
         return any(self.cells[cid].stale for cid in self.ancestors(cell_id))
 
@@ -267,6 +423,8 @@ class DirectedGraph:
             if cell_id not in self.cells:
                 raise ValueError(f"Cell {cell_id} not found")
 
+            self._unindex_references(cell_id, self.cells[cell_id])
+
             # Removing this cell from its defs' definer sets
             for name in self.cells[cell_id].defs:
                 name_defs = self.definitions[name]
@@ -281,28 +439,38 @@ class DirectedGraph:
                 (parent, cell_id) for parent in self.parents[cell_id]
             ]
             for e in edges:
-                broken_cycles = [c for c in self.cycles if e in c]
-                for c in broken_cycles:
-                    self.cycles.remove(c)
+                for c in self._cycles_by_edge.pop(e, set()):
+                    self.cycles.discard(c)
+                    for other_edge in c:
+                        if other_edge != e and (
+                            other_edge in self._cycles_by_edge
+                        ):
+                            self._cycles_by_edge[other_edge].discard(c)
+                            if not self._cycles_by_edge[other_edge]:
+                                del self._cycles_by_edge[other_edge]
 
             # Grab a reference to children before we remove it from our map.
             children = self.children[cell_id]
 
+            # Edges and sibling relations are symmetric, so only this cell's
+            # neighbors need to be updated.
+            for parent_id in self.parents[cell_id]:
+                self.children[parent_id].discard(cell_id)
+            for child_id in children:
+                self.parents[child_id].discard(cell_id)
+            for sibling_id in self.siblings[cell_id]:
+                self.siblings[sibling_id].discard(cell_id)
+
             # Purge this cell from the graph.
             del self.cells[cell_id]
             del self.children[cell_id]
             del self.parents[cell_id]
             del self.siblings[cell_id]
 
-            for elems in self.parents.values():
-                if cell_id in elems:
-                    elems.remove(cell_id)
-            for elems in self.children.values():
-                if cell_id in elems:
-                    elems.remove(cell_id)
-            for elems in self.siblings.values():
-                if cell_id in elems:
-                    elems.remove(cell_id)
+            self._topological_order.remove_cell(cell_id)
+            if not self._topological_order.valid and not self.cycles:
+                # The last known cycle was broken.
+                self._topological_order.recompute(self.parents, self.children)
         LOGGER.debug("Deleted cell %s and Released graph lock.", cell_id)
         return children
 
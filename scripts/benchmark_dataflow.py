@@ -0,0 +1,66 @@
+# Copyright 2024 Marimo. All rights reserved.
+"""Benchmark registering and deleting cells in the dataflow graph.
+
+Registers N synthetic cells, in which each cell defines one variable and
+references a handful of variables defined by earlier cells, then deletes
+them. Prints the wall-clock time per N so the scaling curve can be tracked.
+
+Usage (from the root of the project):
+
+    python scripts/benchmark_dataflow.py
+    python scripts/benchmark_dataflow.py 100 200 400 800 1600
+"""
+
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from marimo._ast import compiler
+from marimo._runtime import dataflow
+from marimo._types.ids import CellId_t
+
+DEFAULT_SIZES = [100, 200, 400, 800, 1600]
+REFS_PER_CELL = 4
+
+
+def synthetic_cells(n: int, seed: int = 0) -> list[tuple[CellId_t, str]]:
+    rng = random.Random(seed)
+    cells: list[tuple[CellId_t, str]] = []
+    for i in range(n):
+        refs = rng.sample(range(i), min(i, REFS_PER_CELL))
+        rhs = " + ".join(f"x{j}" for j in refs) or "0"
+        cells.append((CellId_t(str(i)), f"x{i} = {rhs}"))
+    return cells
+
+
+def bench(n: int) -> tuple[float, float]:
+    compiled = [
+        (cell_id, compiler.compile_cell(code, cell_id=cell_id))
+        for cell_id, code in synthetic_cells(n)
+    ]
+    graph = dataflow.DirectedGraph()
+
+    start = time.perf_counter()
+    for cell_id, cell in compiled:
+        graph.register_cell(cell_id, cell)
+    register_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for cell_id, _ in compiled:
+        graph.delete_cell(cell_id)
+    delete_time = time.perf_counter() - start
+    return register_time, delete_time
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES
+    print(f"{'cells':>8} {'register (s)':>14} {'delete (s)':>12}")
+    for n in sizes:
+        register_time, delete_time = bench(n)
+        print(f"{n:>8} {register_time:>14.4f} {delete_time:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
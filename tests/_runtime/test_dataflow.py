@@ -703,6 +703,25 @@ class TestSQL:
         # cell
         assert graph.get_referring_cells("my_db", language="sql") == set(["1"])
 
+    def test_references_index_on_delete(self) -> None:
+        graph = dataflow.DirectedGraph()
+        graph.register_cell("0", parse_cell("x = 0"))
+        graph.register_cell("1", parse_cell("y = x"))
+        graph.register_cell("2", parse_cell("mo.sql('SELECT * FROM x')"))
+        assert graph.references["python"]["x"] == set(["1"])
+        assert graph.references["sql"]["x"] == set(["2"])
+
+        graph.delete_cell("1")
+        assert "x" not in graph.references["python"]
+        assert graph.get_referring_cells("x", language="python") == set(
+            ["2"]
+        )
+
+        graph.delete_cell("2")
+        assert "x" not in graph.references["sql"]
+        assert graph.get_referring_cells("x", language="python") == set()
+        assert graph.children == {"0": set()}
+
 
 def test_disable_enable_cell() -> None:
     """Test disabling and enabling cells."""
@@ -974,6 +993,43 @@ def test_cycles() -> None:
     assert not graph.cycles
 
 
+def test_cycles_registered_out_of_order() -> None:
+    def assert_topologically_ordered() -> None:
+        positions = graph._topological_order.positions
+        for parent, children in graph.children.items():
+            for child in children:
+                assert positions[parent] < positions[child]
+
+    graph = dataflow.DirectedGraph()
+    # Children registered before their parents: 3 -> 2 -> 1 -> 0
+    graph.register_cell("0", parse_cell("w = z"))
+    graph.register_cell("1", parse_cell("z = y"))
+    graph.register_cell("2", parse_cell("y = x"))
+    graph.register_cell("3", parse_cell("x = 0"))
+    assert not graph.cycles
+    assert_topologically_ordered()
+    assert graph.get_path("3", "0") == [("3", "2"), ("2", "1"), ("1", "0")]
+    assert graph.get_path("0", "3") == []
+
+    # Close a cycle: 3 -> 2 -> 1 -> 0 -> 3
+    graph.delete_cell("3")
+    graph.register_cell("3", parse_cell("x = w"))
+    assert graph.cycles == {(("0", "3"), ("3", "2"), ("2", "1"), ("1", "0"))}
+    assert graph.get_path("0", "1") == [("0", "3"), ("3", "2"), ("2", "1")]
+
+    # Breaking the cycle restores the topological order
+    graph.delete_cell("2")
+    assert not graph.cycles
+    assert graph._topological_order.valid
+    assert_topologically_ordered()
+
+    graph.register_cell("2", parse_cell("y = x"))
+    assert len(graph.cycles) == 1
+    graph.delete_cell("0")
+    assert not graph.cycles
+    assert_topologically_ordered()
+
+
 def test_get_path() -> None:
     """Test the get_path method."""
     graph = dataflow.DirectedGraph()